@@ -36,10 +36,15 @@ def load_AIDJEX(file_path):
 
     file_path           string of a file path to the specific file
     """
-    # Read in data from the file
-    dat = pd.read_table(file_path,header=3,skipfooter=0,engine='python',delim_whitespace=True)
+    # Read in data from the file, only parsing the needed columns
+    #   (the C engine is much faster than the python one, which is only
+    #   needed when skipping footer lines)
+    #   Selecting the columns by a callable, rather than a list, doesn't raise
+    #   when one of them is missing, so the check below can catch that
+    pf_cols = ['Depth(m)', 'Temp(C)', 'Sal(PPT)']
+    dat = pd.read_table(file_path, header=3, sep=r'\s+', engine='c', usecols=lambda col: col in pf_cols, dtype=dict.fromkeys(pf_cols, np.float32))
     # If it finds the correct column headers, put data into arrays
-    if 'Depth(m)' and 'Temp(C)' and 'Sal(PPT)' in dat.columns:
+    if set(pf_cols).issubset(dat.columns):
         temp0 = dat['Temp(C)'][:].values
         salt0 = dat['Sal(PPT)'][:].values
         p0    = dat['Depth(m)'][:].values
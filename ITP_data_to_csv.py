@@ -7,7 +7,7 @@ made by: Mikhail Schee (January 2022)
 import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
-import mat73 # For reading the ITP `cormat` files
+import h5py # For reading the ITP `cormat` files
 
 ################################################################################
 # Select which profile to use
@@ -39,29 +39,30 @@ def load_cormat_itp(file_path):
 
     file_path           string of a file path to the specific file
     """
-    # Load cormat file into dictionary with mat73
-    #   (specific to version of MATLAB used to make cormat files)
-    dat = mat73.loadmat(file_path)
-    # If it finds the correct column headers, put data into arrays
-    if 'te_adj' in dat and 'sa_adj' in dat and 'pr_filt' in dat:
-        temp0 = dat['te_adj']
-        salt0 = dat['sa_adj']
-        p0    = dat['pr_filt']
-        # Down-casts have an issue with the profiler wake, so only take profiles
-        #   that were measured as the profiler was moving upwards
-        if p0[0] < p0[-1]:
-            print('Skipping down-cast')
-            return None
-        # else:
-        #     print('prof:',prof_no,'goes from',p0[0],'to',p0[-1])
-        out_dict = {'temp': temp0,
-                    'salt': salt0,
-                    'p': p0
-                    }
-        # Build output data frame
-        df = pd.DataFrame(out_dict)
-        # Return all the relevant values
-        return df
+    # Open cormat file with h5py
+    #   (the version of MATLAB used to make cormat files saves them as HDF5)
+    #   and read only the variables needed
+    with h5py.File(file_path, 'r') as f:
+        # If it finds the correct column headers, put data into arrays
+        if 'te_adj' in f and 'sa_adj' in f and 'pr_filt' in f:
+            temp0 = f['te_adj'][:].ravel()
+            salt0 = f['sa_adj'][:].ravel()
+            p0    = f['pr_filt'][:].ravel()
+            # Down-casts have an issue with the profiler wake, so only take profiles
+            #   that were measured as the profiler was moving upwards
+            if p0[0] < p0[-1]:
+                print('Skipping down-cast')
+                return None
+            # else:
+            #     print('prof:',prof_no,'goes from',p0[0],'to',p0[-1])
+            out_dict = {'temp': temp0,
+                        'salt': salt0,
+                        'p': p0
+                        }
+            # Build output data frame
+            df = pd.DataFrame(out_dict)
+            # Return all the relevant values
+            return df
 
 ################################################################################
 
@@ -18,53 +18,76 @@ https://stackoverflow.com/questions/41228209/making-gif-from-images-using-imagei
 """
 
 import os
-import imageio
+import numpy as np
 from PIL import Image
+from concurrent.futures import ThreadPoolExecutor # For preparing frames in parallel
 dark_mode = False
 
 gif_file = 'ITP8-1301_v_ITP1-1259.gif'
 png_dir = 'frames'
-print('Saving gif to', gif_file)
 
 # In order to keep the transparency of the png images in the gif
 # found this solution from:
 # https://stackoverflow.com/questions/46850318/transparent-background-in-gif-using-python-imageio
-def generate_alpha_frame(file_path):
-    im = Image.open(file_path)
+#   frame is either the file path of a png image or an RGBA PIL image, which
+#   is what plot_ITP_profile.py passes straight from the matplotlib canvas
+def generate_alpha_frame(frame, dark=dark_mode):
+    if isinstance(frame, Image.Image):
+        im = frame
+    else:
+        im = Image.open(frame)
     alpha = im.getchannel('A')
     # Convert the image into P mode but only use 255 colors in the palette out of 256
-    im = im.convert('RGB').convert('P', palette=Image.ADAPTIVE, colors=255)
+    #   (fast octree quantization is much quicker than the adaptive palette and
+    #   plenty for the few, fixed colors of a matplotlib figure)
+    im = im.convert('RGB').quantize(colors=255, method=Image.Quantize.FASTOCTREE)
     # print(im.getcolors())
     # exit(0)
-    if dark_mode:
-        # Set all pixel values below 128 to 255 , and the rest to 0
-        mask = Image.eval(alpha, lambda a: 255 if a <=10 else 0)
+    if dark:
+        alpha_thr = 10
     else:
-        # Set all pixel values below 128 to 255 , and the rest to 0
-        mask = Image.eval(alpha, lambda a: 255 if a <=20 else 0)
+        alpha_thr = 20
+    # Set all pixel values below the threshold to 255, and the rest to 0
+    #   (with numpy, rather than calling a python function for each pixel)
+    mask = Image.fromarray(np.where(np.asarray(alpha) <= alpha_thr, 255, 0).astype(np.uint8), 'L')
     # Paste the color of index 255 and use alpha as a mask
     im.paste(255, mask)
     # The transparency index is 255
     im.info['transparency'] = 255
     return im
 
-images = []
-# need to sort because os.listdir returns a list of arbitrary order
-for file_name in sorted(os.listdir(png_dir)):
-    if file_name.endswith('.png'):
-        file_path = os.path.join(png_dir, file_name)
-        images.append(generate_alpha_frame(file_path))
-images[0].save(gif_file, save_all=True, append_images=images[1:], duration=100, loop=0, optimize=False, disposal=2)
-exit(0)
+def png_file_paths(dir_path):
+    """
+    Returns a sorted list of the file paths of the png images in a directory
+
+    dir_path        string of the path to the directory
+    """
+    # os.scandir's entries carry their file type, so no extra stat is needed
+    entries = [e for e in os.scandir(dir_path) if e.name.endswith('.png') and e.is_file()]
+    # need to sort because os.scandir returns entries in arbitrary order
+    entries.sort(key=lambda e: e.name)
+    return [e.path for e in entries]
+
+if __name__ == '__main__':
+    print('Saving gif to', gif_file)
+    # Decoding and converting the frames is independent for each frame, and PIL
+    #   releases the GIL while doing it, so do them in parallel (map keeps the
+    #   frames in order)
+    with ThreadPoolExecutor() as executor:
+        frames = executor.map(generate_alpha_frame, png_file_paths(png_dir))
+        first_frame = next(frames)
+        first_frame.save(gif_file, save_all=True, append_images=frames, duration=100, loop=0, optimize=False, disposal=2)
+    exit(0)
+
+    # Only imported here, so importing this module for generate_alpha_frame
+    #   (as plot_ITP_profile.py's workers do) doesn't load imageio
+    import imageio
 
-# To set the frames per second
-fps = 12
-frame_duration = 1.0 / fps
+    # To set the frames per second
+    fps = 12
+    frame_duration = 1.0 / fps
 
-images = []
-# need to sort because os.listdir returns a list of arbitrary order
-for file_name in sorted(os.listdir(png_dir)):
-    if file_name.endswith('.png'):
-        file_path = os.path.join(png_dir, file_name)
-        images.append(imageio.imread(file_path))
-imageio.mimsave(gif_file, images, duration=frame_duration)
+    # Stream each frame into the gif, so only one is held in memory at a time
+    with imageio.get_writer(gif_file, mode='I', duration=frame_duration) as writer:
+        for file_path in png_file_paths(png_dir):
+            writer.append_data(imageio.imread(file_path))
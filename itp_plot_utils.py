@@ -0,0 +1,55 @@
+"""
+Plotting helpers shared by the ITP plotting scripts
+
+made by: Mikhail Schee (January 2022)
+"""
+
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+
+################################################################################
+# Set ticklabel format for all axes made by set_fig_axes, in place of calling
+#   ticklabel_format on each one (set on import, so it holds for any script
+#   using these helpers)
+mpl.rcParams['axes.formatter.limits'] = (-3, 3)
+mpl.rcParams['axes.formatter.use_mathtext'] = True
+
+################################################################################
+
+def set_fig_axes(heights, widths, fig_ratio=0.5, fig_size=1, share_x_axis=None, share_y_axis=None, prjctn=None):
+    """
+    Creates fig and axes objects based on desired heights and widths of subplots
+    Ex: if widths=[1,5], there will be 2 columns, the 1st 1/5 the width of the 2nd
+
+    heights      array of integers for subplot height ratios, len=rows
+    widths       array of integers for subplot width  ratios, len=cols
+    fig_ratio    ratio of height to width of overall figure
+    fig_size     size scale factor, 1 changes nothing, 2 makes it very big
+    share_x_axis bool whether the subplots should share their x axes
+    share_y_axis bool whether the subplots should share their y axes
+    projection   projection type for the subplots
+    """
+    # Set aspect ratio of overall figure
+    w, h = mpl.figure.figaspect(fig_ratio)
+    # Find rows and columns of subplots
+    rows = len(heights)
+    cols = len(widths)
+    # This dictionary makes each subplot have the desired ratios
+    # The length of heights will be nrows and likewise len(widths)=ncols
+    plot_ratios = {'height_ratios': heights,
+                   'width_ratios': widths}
+    # Determine whether to share x or y axes
+    if share_x_axis == None and share_y_axis == None:
+        if rows == 1 and cols != 1: # if only one row, share y axis
+            share_x_axis = False
+            share_y_axis = True
+        elif rows != 1 and cols == 1: # if only one column, share x axis
+            share_x_axis = True
+            share_y_axis = False
+        else:                       # otherwise, forget about it
+            share_x_axis = False
+            share_y_axis = False
+    # Set ratios by passing dictionary as 'gridspec_kw', and share y axis
+    fig, axes = plt.subplots(figsize=(w*fig_size,h*fig_size), nrows=rows, ncols=cols, gridspec_kw=plot_ratios, sharex=share_x_axis, sharey=share_y_axis, subplot_kw=dict(projection=prjctn))
+    # The ticklabel format for all axes is set through rcParams at the top
+    return fig, axes
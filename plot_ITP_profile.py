@@ -5,22 +5,45 @@ made by: Mikhail Schee (January 2022)
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
 import matplotlib as mpl
+# Render with Agg, as the frames are only ever saved, never shown in a window
+mpl.use('Agg')
+import matplotlib.pyplot as plt
 import mpl_toolkits.axes_grid1.inset_locator as plt_inset
+from matplotlib.collections import LineCollection # For the subsampled grid lines
 import pandas as pd
-import mat73 # For reading the ITP `cormat` files
-from scipy import interpolate # For interpolating data
 import os # For checking whether the output directory exists
 import shutil # For removing old versions of the output directory
+from multiprocessing import Pool # For rendering frames in parallel
+from functools import partial # For passing the fixed arguments to the workers
+from PIL import Image # For turning the rendered frames into gif frames
+from create_gif import generate_alpha_frame # For keeping the transparency in the gif
+from itp_plot_utils import set_fig_axes # Shared with plot_T_v_S.py
 
 ################################################################################
+# Whether to write the frames straight into a gif, rather than saving each one
+#   as a png in the output directory to be made into a gif with create_gif.py
+#   (the pngs are still useful for checking individual frames)
+write_gif = True
+
+# Define name of output gif
+gif_file = 'ITP8-1301_v_ITP1-1259.gif'
+
 # Define output directory
 output_dir = 'frames'
 
 # Define name of output frames
 frame_file_name = 'ITP8-1301_v_ITP1-1259_T-S'
 
+# Resolution of the frames in dots per inch, which sets the size of the gif
+#   (the render time scales with the number of pixels, so lower this for
+#   quicker test runs)
+frame_dpi = 400
+
+# Number of processes to render the frames with, None uses every cpu
+#   (each worker holds its own figure, so lower this if memory runs short)
+n_workers = None
+
 # Set parameters
 sample_res  = 1.5
 sample_rate = 40
@@ -104,10 +127,14 @@ pfs_to_plot = [ITP001_1259, ITP008_1301]
 # Whether to write out the subsampled points to a csv
 write_ss_to_csv = True
 
-if write_ss_to_csv:
-    # Check whether there already exists a csv for the
-    if os.path.exists(frame_file_name+'.csv'):
-        os.remove(frame_file_name+'.csv')
+################################################################################
+# Don't redraw after every plotting call, frames are drawn when they are saved
+plt.ioff()
+# Let Agg simplify the long profile lines before rasterizing them, and draw
+#   them in chunks
+mpl.rcParams['path.simplify'] = True
+mpl.rcParams['path.simplify_threshold'] = 1.0
+mpl.rcParams['agg.path.chunksize'] = 10000
 
 ################################################################################
 # Set plot mode
@@ -138,64 +165,71 @@ def interp_pts(res, p, t, s):
     t       The original data's temperature array
     s       The original data's salinity array
         Note: p, t, and s must all be the same length
-              Requires the following import statement:
-               from scipy import interpolate
     """
     # Interpolate the data to the given resolution
-    #   Define interpolated functions
-    temp1 = interpolate.interp1d(p, t)
-    salt1 = interpolate.interp1d(p, s)
-    #   Define new pressure axis
-    p_new = np.arange(min(p), max(p), res)
-    #   Interpolate temp and salt on new p axis
-    t_new = temp1(p_new)
-    s_new = salt1(p_new)
+    #   np.interp needs increasing pressures, but profiles are up-casts
+    p_arr   = np.asarray(p)
+    p_order = np.argsort(p_arr, kind='mergesort')
+    p_srt, t_srt, s_srt = p_arr[p_order], np.asarray(t)[p_order], np.asarray(s)[p_order]
+    #   Define new pressure axis, from the min to the max of the sorted pressures
+    #   (stepping in float64 so the step doesn't drift along the axis)
+    p_new = np.arange(float(p_srt[0]), float(p_srt[-1]), res).astype(np.float32)
+    #   Linearly interpolate temp and salt on new p axis
+    #   (keeping the new arrays in float32, like the data they come from)
+    t_new = np.interp(p_new, p_srt, t_srt).astype(np.float32)
+    s_new = np.interp(p_new, p_srt, s_srt).astype(np.float32)
     return p_new, t_new, s_new
 
 ################################################################################
 
-def set_fig_axes(heights, widths, fig_ratio=0.5, fig_size=1, share_x_axis=None, share_y_axis=None, prjctn=None):
+# Profile data read from csv files, keyed by the csv file name, so each file is
+#   only read once no matter how many frames are made
+_csv_cache = {}
+# Arrays of the (interpolated) profiles, keyed by the arguments of _get_profile,
+#   which stay the same for every frame of the animation
+_profile_cache = {}
+
+def _get_profile(csv, p_lims, interp, s_res, s_rate):
     """
-    Creates fig and axes objects based on desired heights and widths of subplots
-    Ex: if widths=[1,5], there will be 2 columns, the 1st 1/5 the width of the 2nd
-
-    heights      array of integers for subplot height ratios, len=rows
-    widths       array of integers for subplot width  ratios, len=cols
-    fig_ratio    ratio of height to width of overall figure
-    fig_size     size scale factor, 1 changes nothing, 2 makes it very big
-    share_x_axis bool whether the subplots should share their x axes
-    share_y_axis bool whether the subplots should share their y axes
-    projection   projection type for the subplots
+    Returns the pressure, temperature, and salinity arrays of a profile within
+    the given pressure limits, as well as the [min, max] of the temperature
+    and salinity. The csv is only read and the data only
+    interpolated the first time a profile is requested, after that the cached
+    arrays are returned
+
+    csv         string of the file path to the profile's csv
+    p_lims      Limits for the pressure axis [p_min, p_max], or None
+    interp      True or False as to whether to interpolate the data
+    s_res       the sub-sampling resolution
+    s_rate      the sub-sampling rate
+                    Interpolation happens at s_res / s_rate
     """
-    # Set aspect ratio of overall figure
-    w, h = mpl.figure.figaspect(fig_ratio)
-    # Find rows and columns of subplots
-    rows = len(heights)
-    cols = len(widths)
-    # This dictionary makes each subplot have the desired ratios
-    # The length of heights will be nrows and likewise len(widths)=ncols
-    plot_ratios = {'height_ratios': heights,
-                   'width_ratios': widths}
-    # Determine whether to share x or y axes
-    if share_x_axis == None and share_y_axis == None:
-        if rows == 1 and cols != 1: # if only one row, share y axis
-            share_x_axis = False
-            share_y_axis = True
-        elif rows != 1 and cols == 1: # if only one column, share x axis
-            share_x_axis = True
-            share_y_axis = False
-        else:                       # otherwise, forget about it
-            share_x_axis = False
-            share_y_axis = False
-    # Set ratios by passing dictionary as 'gridspec_kw', and share y axis
-    fig, axes = plt.subplots(figsize=(w*fig_size,h*fig_size), nrows=rows, ncols=cols, gridspec_kw=plot_ratios, sharex=share_x_axis, sharey=share_y_axis, subplot_kw=dict(projection=prjctn))
-    # Set ticklabel format for all axes
-    if (rows+cols)>2:
-        for ax in axes.flatten():
-            ax.ticklabel_format(style='sci', scilimits=(-3,3), useMathText=True)
-    else:
-        axes.ticklabel_format(style='sci', scilimits=(-3,3), useMathText=True)
-    return fig, axes
+    if not isinstance(p_lims, type(None)):
+        p_lims = tuple(p_lims)
+    key = (csv, p_lims, interp, s_res, s_rate)
+    if key not in _profile_cache:
+        # Import data from csv, only parsing the needed columns and straight
+        #   to float32, which is plenty of precision for plotting and halves
+        #   the memory every later operation goes through
+        if csv not in _csv_cache:
+            _csv_cache[csv] = pd.read_csv(csv, usecols=['p', 'temp', 'salt'], dtype=np.float32, engine='c')
+        data = _csv_cache[csv]
+        # Set limits
+        #   (comparing the numpy array skips building pandas Series for the mask)
+        if not isinstance(p_lims, type(None)):
+            p = data['p'].values
+            data = data[(p > p_lims[0]) & (p < p_lims[1])]
+        if interp:
+            # Interpolate the data to the given resolution
+            p_new, t_new, s_new = interp_pts(s_res/s_rate, data['p'], data['temp'], data['salt'])
+        else:
+            # Just use the original data
+            p_new, t_new, s_new = data['p'].values, data['temp'].values, data['salt'].values
+        # Find the ranges once, they are needed for the limits and grid lines
+        t_lims = (t_new.min(), t_new.max())
+        s_lims = (s_new.min(), s_new.max())
+        _profile_cache[key] = (p_new, t_new, s_new, t_lims, s_lims)
+    return _profile_cache[key]
 
 ################################################################################
 
@@ -204,8 +238,8 @@ def add_inset_to_axis(ax, x_arr, y_arr, clr, inset_mrks, inset_ylims, inset_pos,
     Adds an inset to a given axis
 
     ax              main axis on which to add inset
-    x_arr           horizontal axis of data
-    y_arr           vertical axis of data
+    x_arr           numpy array of the horizontal axis of data
+    y_arr           numpy array of the vertical axis of data
     clr             color which to draw the line on the inset
     inset_mrks      True or False as to whether to include markers on the inset
     inset_ylims     array of y limits for the inset [y_min, y_max]
@@ -227,75 +261,153 @@ def add_inset_to_axis(ax, x_arr, y_arr, clr, inset_mrks, inset_ylims, inset_pos,
         ax_in.scatter(x_arr, -y_arr, color=std_clr, s=small_mrk_size, marker=mkr_style, linewidth=mkr_ln_wd, zorder=3)
     # Restrict limits of inset
     ax_in.set_ylim([-inset_ylims[1], -inset_ylims[0]])
-    df = pd.DataFrame()
-    df = df.assign(x=x_arr, y=y_arr)
-    x_arr_in = df[(df['y'] > inset_ylims[0]) & (df['y'] < inset_ylims[1])].x
-    ax_in.set_xlim([min(x_arr_in), max(x_arr_in)])
+    in_mask  = (y_arr > inset_ylims[0]) & (y_arr < inset_ylims[1])
+    x_arr_in = x_arr[in_mask]
+    x_min_in, x_max_in = x_arr_in.min(), x_arr_in.max()
+    ax_in.set_xlim([x_min_in, x_max_in])
     # Fix the number of ticks on the inset axes
-    ax_in.set_xticks(np.linspace(min(x_arr_in), max(x_arr_in), 2))
+    ax_in.set_xticks(np.linspace(x_min_in, x_max_in, 2))
     ax_in.set_yticks(np.linspace(-inset_ylims[0], -inset_ylims[1], 3))
 
 ################################################################################
 
+# The figure and axes of the animation, which are made for the first frame and
+#   then reused for every following frame of the same profiles
+_fig_cache = {}
+# The artists of the subsampled profiles, keyed by the axis they were first
+#   plotted on, so they can be moved to the next frame's points
+_ss_artists = {}
+
+def _vline_segs(x, y_min, y_max):
+    """
+    Returns an array of the segments of vertical lines, as for a LineCollection
+
+    x           array of the horizontal positions of the lines
+    y_min       the bottom of the lines
+    y_max       the top of the lines
+    """
+    segs = np.empty((len(x), 2, 2))
+    segs[:, :, 0] = np.asarray(x)[:, None]
+    segs[:, 0, 1] = y_min
+    segs[:, 1, 1] = y_max
+    return segs
+
+def _hline_segs(y, x_min, x_max):
+    """
+    Returns an array of the segments of horizontal lines, as for a LineCollection
+
+    y           array of the vertical positions of the lines
+    x_min       the left end of the lines
+    x_max       the right end of the lines
+    """
+    segs = np.empty((len(y), 2, 2))
+    segs[:, 0, 0] = x_min
+    segs[:, 1, 0] = x_max
+    segs[:, :, 1] = np.asarray(y)[:, None]
+    return segs
+
+def _add_line_collection(ax, segs, **kwargs):
+    """
+    Adds a LineCollection of the given segments to the axis and returns it,
+    so its segments can be updated on later frames
+
+    ax          the axis on which to add the lines
+    segs        array of line segments, as from _vline_segs or _hline_segs
+    kwargs      keyword arguments for the LineCollection (colors, etc.)
+    """
+    lc = LineCollection(segs, **kwargs)
+    # Let the first frame's lines count towards the data limits, as vlines and
+    #   hlines did, so the axes are framed the same (the limits are not
+    #   recomputed when the segments are moved on later frames)
+    ax.add_collection(lc)
+    return lc
+
+def _update_ss_artists(ss_artists, t_ss, s_ss, y_ss):
+    """
+    Moves the subsampled profile artists made for the first frame to the
+    subsampled points of a new frame
+
+    ss_artists  dictionary of the artists, as made by plot_T_S_separate or
+                    plot_T_S_together
+    t_ss        the subsampled temperature array
+    s_ss        the subsampled salinity array
+    y_ss        the subsampled pressure array, as plotted on the vertical axis
+    """
+    for var, x_ss in [('T', t_ss), ('S', s_ss)]:
+        if var+'_ln' in ss_artists:
+            ss_artists[var+'_ln'].set_data(x_ss, y_ss)
+        if var+'_sc' in ss_artists:
+            ss_artists[var+'_sc'].set_offsets(np.column_stack([x_ss, y_ss]))
+        if var+'_vl' in ss_artists:
+            lc, y_min, y_max = ss_artists[var+'_vl']
+            lc.set_segments(_vline_segs(x_ss, y_min, y_max))
+        if var+'_hl' in ss_artists:
+            lc, x_min, x_max = ss_artists[var+'_hl']
+            lc.set_segments(_hline_segs(y_ss, x_min, x_max))
+
+################################################################################
+
 def plot_T_S_separate(axes, df, s_res, s_rate, i_offset):
-    # Import data from csv
+    # Get the profile's data, interpolated to the given resolution
     csv  = df['SOURCE']+'-'+df['INSTRMT']+'_'+df['PROF_NO']+'.csv'
-    data = pd.read_csv(csv)
     p_lims = df['p_lims']
-    # Set limits
-    if not isinstance(p_lims, type(None)):
-        p_lim_low  = 'p>'+str(p_lims[0])
-        data       = data.query(p_lim_low)
-        p_lim_high = 'p<'+str(p_lims[1])
-        data       = data.query(p_lim_high)
-    # Interpolate the data to the given resolution
-    p_new, t_new, s_new = interp_pts(s_res/s_rate, data['p'], data['temp'], data['salt'])
+    p_new, t_new, s_new, t_lims, s_lims = _get_profile(csv, p_lims, True, s_res, s_rate)
     # Subsample the interpolated data
     p_ss, t_ss, s_ss = p_new[i_offset::s_rate], t_new[i_offset::s_rate], s_new[i_offset::s_rate]
+    # Pressure is plotted downwards, so negate the subsample once for all artists
+    neg_p_ss = -p_ss
     #
-    # Plot interpolated profile
-    axes[0].plot(t_new, -p_new, color=t_clr, linewidth=2, alpha=0.7, zorder=1, label='Original T profile')
-    axes[1].plot(s_new, -p_new, color=s_clr, linewidth=2, alpha=0.7, zorder=1, label='Original S profile')
-    # Subsampled profiles
-    axes[0].plot(t_ss, -p_ss, color=t_clr, linestyle='--', alpha=1, zorder=3, label='Subsampled T profile')
-    axes[1].plot(s_ss, -p_ss, color=s_clr, linestyle='--', alpha=1, zorder=3, label='Subsampled S profile')
-    #   Plot points of subsampled profile
-    axes[0].scatter(t_ss, -p_ss, color=t_clr, s=mrk_size, marker=mkr_style, zorder=3)
-    axes[1].scatter(s_ss, -p_ss, color=s_clr, s=mrk_size, marker=mkr_style, zorder=3)
-    # Add subsampled grid
-    #   vertical lines
-    axes[0].vlines(t_ss, -p_lims[1], -p_lims[0], linewidths=1, linestyles='--', colors=t_clr, alpha=0.5, zorder=4)
-    axes[1].vlines(s_ss, -p_lims[1], -p_lims[0], linewidths=1, linestyles='--', colors=s_clr, alpha=0.5, zorder=4)
-    #   horizontal lines
-    axes[0].hlines(-p_ss, min(t_new), max(t_new), linewidths=1, linestyles=':', colors=ss_clr, alpha=0.5, zorder=4)
-    axes[1].hlines(-p_ss, min(s_new), max(s_new), linewidths=1, linestyles=':', colors=ss_clr, alpha=0.5, zorder=4)
-    #
-    # Set titles and labels
-    axes[0].set_title(df['SOURCE']+'-'+df['INSTRMT']+' profile '+df['PROF_NO']+' Temperature')
-    axes[0].set_ylabel('Pressure (dbar)')
-    axes[0].set_xlabel(r'Temperature ($^\circ$C)')
-    axes[0].legend()
-    #
-    axes[1].set_title(df['SOURCE']+'-'+df['INSTRMT']+' profile '+df['PROF_NO']+' Salinity')
-    axes[1].set_xlabel(r'Salinity (g/kg)')
-    axes[1].legend()
-    # Output the dataframe for the subsampled profiles
-    out_dict = {'SOURCE': [df['SOURCE']]*len(t_ss),
-                'INSTRMT': [df['INSTRMT']]*len(t_ss),
-                'PROF_NO': [df['PROF_NO']]*len(t_ss),
-                'i_offset': [i_offset]*len(t_ss),
+    # Only move the subsampled profiles if the axes were plotted on already
+    if axes[0] in _ss_artists:
+        _update_ss_artists(_ss_artists[axes[0]], t_ss, s_ss, neg_p_ss)
+    else:
+        ss_artists = {}
+        # Plot interpolated profile
+        neg_p_new = -p_new
+        axes[0].plot(t_new, neg_p_new, color=t_clr, linewidth=2, alpha=0.7, zorder=1, label='Original T profile')
+        axes[1].plot(s_new, neg_p_new, color=s_clr, linewidth=2, alpha=0.7, zorder=1, label='Original S profile')
+        # Subsampled profiles
+        ss_artists['T_ln'], = axes[0].plot(t_ss, neg_p_ss, color=t_clr, linestyle='--', alpha=1, zorder=3, label='Subsampled T profile')
+        ss_artists['S_ln'], = axes[1].plot(s_ss, neg_p_ss, color=s_clr, linestyle='--', alpha=1, zorder=3, label='Subsampled S profile')
+        #   Plot points of subsampled profile
+        ss_artists['T_sc'] = axes[0].scatter(t_ss, neg_p_ss, color=t_clr, s=mrk_size, marker=mkr_style, zorder=3)
+        ss_artists['S_sc'] = axes[1].scatter(s_ss, neg_p_ss, color=s_clr, s=mrk_size, marker=mkr_style, zorder=3)
+        # Add subsampled grid
+        #   vertical lines
+        ss_artists['T_vl'] = (_add_line_collection(axes[0], _vline_segs(t_ss, -p_lims[1], -p_lims[0]), linewidths=1, linestyles='--', colors=t_clr, alpha=0.5, zorder=4), -p_lims[1], -p_lims[0])
+        ss_artists['S_vl'] = (_add_line_collection(axes[1], _vline_segs(s_ss, -p_lims[1], -p_lims[0]), linewidths=1, linestyles='--', colors=s_clr, alpha=0.5, zorder=4), -p_lims[1], -p_lims[0])
+        #   horizontal lines
+        ss_artists['T_hl'] = (_add_line_collection(axes[0], _hline_segs(neg_p_ss, t_lims[0], t_lims[1]), linewidths=1, linestyles=':', colors=ss_clr, alpha=0.5, zorder=4), t_lims[0], t_lims[1])
+        ss_artists['S_hl'] = (_add_line_collection(axes[1], _hline_segs(neg_p_ss, s_lims[0], s_lims[1]), linewidths=1, linestyles=':', colors=ss_clr, alpha=0.5, zorder=4), s_lims[0], s_lims[1])
+        _ss_artists[axes[0]] = ss_artists
+        #
+        # Set titles and labels
+        axes[0].set_title(df['SOURCE']+'-'+df['INSTRMT']+' profile '+df['PROF_NO']+' Temperature')
+        axes[0].set_ylabel('Pressure (dbar)')
+        axes[0].set_xlabel(r'Temperature ($^\circ$C)')
+        axes[0].legend()
+        #
+        axes[1].set_title(df['SOURCE']+'-'+df['INSTRMT']+' profile '+df['PROF_NO']+' Salinity')
+        axes[1].set_xlabel(r'Salinity (g/kg)')
+        axes[1].legend()
+    # Output the arrays for the subsampled profiles, which are only built
+    #   into one dataframe after all the frames are made
+    out_dict = {'SOURCE': np.full(len(t_ss), df['SOURCE']),
+                'INSTRMT': np.full(len(t_ss), df['INSTRMT']),
+                'PROF_NO': np.full(len(t_ss), df['PROF_NO']),
+                'i_offset': np.full(len(t_ss), i_offset),
                 'temp': t_ss,
                 'salt': s_ss,
                 'p': p_ss
                 }
-    # Build output data frame
-    return pd.DataFrame(out_dict)
+    return out_dict
 
 ################################################################################
 
 def plot_T_S_together(ax, df, s_res, s_rate, i_offset):
     """
-    Function to make a profile plot on the given axis
+    Function to make a profile plot on the given axis. If the axis was already
+    plotted on, only the subsampled profiles are moved to the new offset
 
     ax          the axis on which to plot
     df          a pandas dataframe containing data and parameters for the plot
@@ -303,123 +415,124 @@ def plot_T_S_together(ax, df, s_res, s_rate, i_offset):
     s_rate      the sub-sampling rate
     i_offset    an integer for the offset in the vertical of the sub-sampling
     """
-    # Import data from csv
+    # Get the profile's data, interpolated to the given resolution if requested
     csv  = df['SOURCE']+'-'+df['INSTRMT']+'_'+df['PROF_NO']+'.csv'
-    data = pd.read_csv(csv)
     p_lims = df['p_lims']
-    # Set limits
-    if not isinstance(p_lims, type(None)):
-        p_lim_low  = 'p>'+str(p_lims[0])
-        data       = data.query(p_lim_low)
-        p_lim_high = 'p<'+str(p_lims[1])
-        data       = data.query(p_lim_high)
-    if df['interpolate']:
-        # Interpolate the data to the given resolution
-        p_new, t_new, s_new = interp_pts(s_res/s_rate, data['p'], data['temp'], data['salt'])
-    else:
-        # Just use the original data
-        p_new, t_new, s_new = data['p'], data['temp'], data['salt']
-    # Plot original profile
-    og_T_ln = ax.plot(t_new, p_new, color=t_clr, linewidth=2, alpha=0.7, zorder=1, label='Original T profile')
-    # Plot markers for all points in original profile
-    if df['og_markers']:
-        ax.scatter(t_new, p_new, color=t_clr, s=mrk_size, marker=mkr_style, zorder=1)
-    # Add subsampled profile?
+    p_new, t_new, s_new, t_lims, s_lims = _get_profile(csv, p_lims, df['interpolate'], s_res, s_rate)
     if df['subsample'] and df['interpolate']:
         if isinstance(i_offset, type(None)):
             i_offset = 0
         # Subsample the interpolated data
         p_ss, t_ss, s_ss = p_new[i_offset::s_rate], t_new[i_offset::s_rate], s_new[i_offset::s_rate]
-        # Subsampled profiles
-        ss_T_ln = ax.plot(t_ss, p_ss, color=t_clr, linestyle='--', alpha=1, zorder=3, label='Subsampled T profile')
-        #   Plot points of subsampled profile
-        ax.scatter(t_ss, p_ss, color=t_clr, s=mrk_size, marker=mkr_style, zorder=3)
-        #
-        # Add subsampled grid vertical lines
-        if df['ss_grid_vert']:
-            ax.vlines(t_ss, p_lims[1], p_lims[0], linewidths=1, linestyles='-.', colors=t_clr, alpha=0.5, zorder=4)
-        t_span = max(t_new) - min(t_new)
-        t_min  = min(t_new) - (1/15)*t_span
-        t_max  = max(t_new) + (1/15)*t_span
-        # Get all the lines in one legend
-        lines  = og_T_ln + ss_T_ln
-    else:
-        # Get all the lines in one legend
-        lines  = og_T_ln
-    #
-    # Add inset?
-    if not isinstance(df['inset'], type(None)):
-        add_inset_to_axis(ax, t_new.values, p_new.values, t_clr, df['inset_markers'], df['inset'], [0.25, 0.2, 0.4, 0.4], zoom_locs=[2,1])
-    # Set titles and labels
-    ax.set_title(df['SOURCE']+' '+df['INSTRMT']+' profile '+df['PROF_NO'])
     y_label = 'Pressure (dbar)'
-    ax.set_xlabel(r'Temperature ($^\circ$C)', color=t_clr)
-    # Change colors of the vertical axes numbers
-    ax.tick_params(axis='x', colors=t_clr)
     #
-    # Plot the salinity profile on top?
-    if df['plot_S']:
-        # Create twin axes to plot T and S ontop of one another
-        ax2 = ax.twiny()
+    # Only move the subsampled profiles if the axis was plotted on already
+    if ax in _ss_artists:
+        if df['subsample'] and df['interpolate']:
+            _update_ss_artists(_ss_artists[ax], t_ss, s_ss, p_ss)
+    else:
+        ss_artists = {}
         # Plot original profile
-        og_S_ln = ax2.plot(s_new, p_new, color=s_clr, linewidth=2, alpha=0.7, zorder=1, label='Original S profile')
+        og_T_ln = ax.plot(t_new, p_new, color=t_clr, linewidth=2, alpha=0.7, zorder=1, label='Original T profile')
         # Plot markers for all points in original profile
         if df['og_markers']:
-            ax2.scatter(s_new, p_new, color=s_clr, s=mrk_size, marker=mkr_style, zorder=1)
+            ax.scatter(t_new, p_new, color=t_clr, s=mrk_size, marker=mkr_style, zorder=1)
         # Add subsampled profile?
         if df['subsample'] and df['interpolate']:
-            ss_S_ln = ax2.plot(s_ss, p_ss, color=s_clr, linestyle='--', alpha=1, zorder=3, label='Subsampled S profile')
-            ax2.scatter(s_ss, p_ss, color=s_clr, s=mrk_size, marker=mkr_style, zorder=3)
+            # Subsampled profiles
+            ss_T_ln = ax.plot(t_ss, p_ss, color=t_clr, linestyle='--', alpha=1, zorder=3, label='Subsampled T profile')
+            ss_artists['T_ln'] = ss_T_ln[0]
+            #   Plot points of subsampled profile
+            ss_artists['T_sc'] = ax.scatter(t_ss, p_ss, color=t_clr, s=mrk_size, marker=mkr_style, zorder=3)
+            #
+            # Add subsampled grid vertical lines
             if df['ss_grid_vert']:
-                ax2.vlines(s_ss, p_lims[1], p_lims[0], linewidths=1, linestyles='-.', colors=s_clr, alpha=0.5, zorder=4)
+                ss_artists['T_vl'] = (_add_line_collection(ax, _vline_segs(t_ss, p_lims[1], p_lims[0]), linewidths=1, linestyles='-.', colors=t_clr, alpha=0.5, zorder=4), p_lims[1], p_lims[0])
+            t_span = t_lims[1] - t_lims[0]
+            t_min  = t_lims[0] - (1/15)*t_span
+            t_max  = t_lims[1] + (1/15)*t_span
             # Get all the lines in one legend
-            lines  += og_S_ln + ss_S_ln
+            lines  = og_T_ln + ss_T_ln
         else:
             # Get all the lines in one legend
-            lines  += og_S_ln
-        # Set salinity labels and colors
-        ax2.set_xlabel(r'Salinity (g/kg)', color=s_clr)
+            lines  = og_T_ln
+        #
+        # Add inset?
+        if not isinstance(df['inset'], type(None)):
+            add_inset_to_axis(ax, t_new, p_new, t_clr, df['inset_markers'], df['inset'], [0.25, 0.2, 0.4, 0.4], zoom_locs=[2,1])
+        # Set titles and labels
+        ax.set_title(df['SOURCE']+' '+df['INSTRMT']+' profile '+df['PROF_NO'])
+        ax.set_xlabel(r'Temperature ($^\circ$C)', color=t_clr)
         # Change colors of the vertical axes numbers
-        ax2.tick_params(axis='x', colors=s_clr)
+        ax.tick_params(axis='x', colors=t_clr)
         #
-        # Set limits on temperature and salinity axes so the profiles don't overlap
-        t_max = max(t_new)+(1/6)*t_span
-        ax.set_xlim([t_min, t_max])
-        s_span = max(s_new) - min(s_new)
-        ax2.set_xlim([min(s_new)-(1/6)*s_span, max(s_new) + (1/15)*s_span])
-    #
-    #   horizontal lines
-    if df['ss_grid_hori']:
-        ax.hlines(p_ss, t_min, t_max, linewidths=1, linestyles=':', colors=ss_clr, alpha=0.5, zorder=4)
-    # Get all the lines in one legend
-    if df['legend']:
-        labels = [l.get_label() for l in lines]
-        if len(labels) > 1:
-            ax.legend(lines, labels)
+        # Plot the salinity profile on top?
+        if df['plot_S']:
+            # Create twin axes to plot T and S ontop of one another
+            ax2 = ax.twiny()
+            # Plot original profile
+            og_S_ln = ax2.plot(s_new, p_new, color=s_clr, linewidth=2, alpha=0.7, zorder=1, label='Original S profile')
+            # Plot markers for all points in original profile
+            if df['og_markers']:
+                ax2.scatter(s_new, p_new, color=s_clr, s=mrk_size, marker=mkr_style, zorder=1)
+            # Add subsampled profile?
+            if df['subsample'] and df['interpolate']:
+                ss_S_ln = ax2.plot(s_ss, p_ss, color=s_clr, linestyle='--', alpha=1, zorder=3, label='Subsampled S profile')
+                ss_artists['S_ln'] = ss_S_ln[0]
+                ss_artists['S_sc'] = ax2.scatter(s_ss, p_ss, color=s_clr, s=mrk_size, marker=mkr_style, zorder=3)
+                if df['ss_grid_vert']:
+                    ss_artists['S_vl'] = (_add_line_collection(ax2, _vline_segs(s_ss, p_lims[1], p_lims[0]), linewidths=1, linestyles='-.', colors=s_clr, alpha=0.5, zorder=4), p_lims[1], p_lims[0])
+                # Get all the lines in one legend
+                lines  += og_S_ln + ss_S_ln
+            else:
+                # Get all the lines in one legend
+                lines  += og_S_ln
+            # Set salinity labels and colors
+            ax2.set_xlabel(r'Salinity (g/kg)', color=s_clr)
+            # Change colors of the vertical axes numbers
+            ax2.tick_params(axis='x', colors=s_clr)
+            #
+            # Set limits on temperature and salinity axes so the profiles don't overlap
+            t_max = t_lims[1]+(1/6)*t_span
+            ax.set_xlim([t_min, t_max])
+            s_span = s_lims[1] - s_lims[0]
+            ax2.set_xlim([s_lims[0]-(1/6)*s_span, s_lims[1] + (1/15)*s_span])
+        #
+        #   horizontal lines
+        if df['ss_grid_hori']:
+            ss_artists['T_hl'] = (_add_line_collection(ax, _hline_segs(p_ss, t_min, t_max), linewidths=1, linestyles=':', colors=ss_clr, alpha=0.5, zorder=4), t_min, t_max)
+        # Get all the lines in one legend
+        if df['legend']:
+            labels = [l.get_label() for l in lines]
+            if len(labels) > 1:
+                ax.legend(lines, labels)
+        _ss_artists[ax] = ss_artists
     #
 
     if df['subsample']:
         if df['plot_S']:
-            # Output the dataframe for the subsampled profiles
-            out_dict = {'SOURCE': [df['SOURCE']]*len(t_ss),
-                        'INSTRMT': [df['INSTRMT']]*len(t_ss),
-                        'PROF_NO': [df['PROF_NO']]*len(t_ss),
-                        'i_offset': [i_offset]*len(t_ss),
+            # Output the arrays for the subsampled profiles, which are only built
+            #   into one dataframe after all the frames are made
+            out_dict = {'SOURCE': np.full(len(t_ss), df['SOURCE']),
+                        'INSTRMT': np.full(len(t_ss), df['INSTRMT']),
+                        'PROF_NO': np.full(len(t_ss), df['PROF_NO']),
+                        'i_offset': np.full(len(t_ss), i_offset),
                         'temp': t_ss,
                         'salt': s_ss,
                         'p': p_ss
                         }
-            # Build output data frame
-            return y_label, pd.DataFrame(out_dict)
+            return y_label, out_dict
         #
     #
     return y_label, None
 
 ################################################################################
 
-def plot_profile(pfs_to_plot, s_res, s_rate, i_offset=None, filename=None, ss_pf_list=None):
+def plot_profile(pfs_to_plot, s_res, s_rate, i_offset=None, filename=None, ss_pf_list=None, show=True):
     """
-    Plots the Temperature vs Salinity data
+    Plots the Temperature vs Salinity data. The figure is made on the first
+    call and reused by later calls with the same profiles, s_res and s_rate,
+    only moving the subsampled profiles
 
     pfs_to_plot     A list of data frames, one for each profile
     data        A pandas DataFrame with the following columns:
@@ -431,58 +544,184 @@ def plot_profile(pfs_to_plot, s_res, s_rate, i_offset=None, filename=None, ss_pf
                     Interpolation happens at s_res / s_rate
     i_offset    The index offset for subsampling
     p_lims      Limits for the pressure axis [p_min, p_max]
-    ss_pf_list  A blank list in which to store the dataframes of ss profiles
+    ss_pf_list  A blank list in which to store the dictionaries of arrays of
+                    the ss profiles
+    show        True or False as to whether to show the plot if no filename
+                    is given
     """
     # Start plot title
     plt_title = 'Profiles subsampled at '+str(s_res)+'m resolution'
     if not isinstance(i_offset, type(None)):
         plt_title += ', offset: '+str(i_offset).zfill(2)
-    # Set figure and axes for plot
-    fig, axes = set_fig_axes([1], [1,1], fig_ratio=0.5, fig_size=1.0, share_x_axis=False, share_y_axis=False)
+    # Set figure and axes for plot, reusing them after the first frame
+    #   The whole figure depends on the profiles' settings and the sampling, so
+    #   start a new one if any of them changed since the last call
+    fig_key = (repr(pfs_to_plot), s_res, s_rate)
+    if 'fig' in _fig_cache and _fig_cache['key'] != fig_key:
+        plt.close(_fig_cache['fig'])
+        _fig_cache.clear()
+        _ss_artists.clear()
+    first_frame = 'fig' not in _fig_cache
+    if first_frame:
+        _fig_cache['fig'], _fig_cache['axes'] = set_fig_axes([1], [1,1], fig_ratio=0.5, fig_size=1.0, share_x_axis=False, share_y_axis=False)
+        _fig_cache['key'] = fig_key
+    fig, axes = _fig_cache['fig'], _fig_cache['axes']
     #
     if len(pfs_to_plot) == 2:
         y_label0, pf0 = plot_T_S_together(axes[0], pfs_to_plot[0], s_res, s_rate, i_offset)
         y_label1, pf1 = plot_T_S_together(axes[1], pfs_to_plot[1], s_res, s_rate, i_offset)
-        axes[0].set_ylabel(y_label0)
-        axes[0].invert_yaxis()
-        axes[1].invert_yaxis()
-        if not isinstance(ss_pfs, type(None)):
-            ss_pfs.append(pf0)
-            ss_pfs.append(pf1)
+        if first_frame:
+            axes[0].set_ylabel(y_label0)
+            axes[0].invert_yaxis()
+            axes[1].invert_yaxis()
+        if not isinstance(ss_pf_list, type(None)):
+            ss_pf_list.append(pf0)
+            ss_pf_list.append(pf1)
     else:
         y_label, pf = plot_T_S_separate(axes, pfs_to_plot[0], s_res, s_rate, i_offset)
-        axes.set_ylabel(y_label)
-        axes.invert_yaxis()
-        if not isinstance(ss_pfs, type(None)):
-            ss_pfs.append(pf)
-    plt.tight_layout(pad=4)
-    # Add overall plot title
-    fig.suptitle(plt_title)
+        if first_frame:
+            axes.set_ylabel(y_label)
+            axes.invert_yaxis()
+        if not isinstance(ss_pf_list, type(None)):
+            ss_pf_list.append(pf)
+    # The layout doesn't change between frames, so only fit it once
+    if first_frame:
+        plt.tight_layout(pad=4)
+        # Add overall plot title
+        _fig_cache['title'] = fig.suptitle(plt_title)
+    else:
+        # Only the offset in the title changes
+        _fig_cache['title'].set_text(plt_title)
     #
     if filename != None:
-        plt.savefig(filename, dpi=400, transparent=True)
-        # Close the figure after saving to avoid memory leaks when making many
-        #   figures in a loop
-        plt.close(fig)
-    else:
+        # Write the png straight from the Agg canvas, skipping savefig's
+        #   format dispatch, and keep the figure open so it can be reused for
+        #   the next frame
+        #   (the frames are only intermediate files for the gif, so spend as
+        #   little time as possible compressing them)
+        set_transparent_dpi(fig, frame_dpi)
+        fig.canvas.print_png(filename, pil_kwargs={'compress_level': 1})
+    elif show:
         plt.show()
-    return ss_pfs
+    return ss_pf_list
 
 ################################################################################
 
-# Check whether there already exists a directory for the output frames
-if os.path.exists(output_dir):
-    shutil.rmtree(output_dir)
-os.makedirs(output_dir)
+def set_transparent_dpi(fig, dpi):
+    """
+    Makes the background of the figure transparent, as savefig(transparent=True)
+    does, and sets the resolution at which it will be rendered
 
-# Create empty list for dataframes of the subsampled profiles
-ss_pfs = []
+    fig         the figure to render
+    dpi         the resolution at which to render, in dots per inch
+    """
+    fig.patch.set_facecolor('none')
+    fig.patch.set_edgecolor('none')
+    for ax in fig.axes:
+        ax.patch.set_facecolor('none')
+        ax.patch.set_edgecolor('none')
+    fig.set_dpi(dpi)
+
+def canvas_to_image(fig, dpi):
+    """
+    Renders the figure with the Agg backend and returns it as a PIL image,
+    without the round trip of encoding and decoding a png file
 
-# Create frames for the animation
-for i in range(sample_rate):
-    # ss_pfs = plot_profile(pfs_to_plot, sample_res, sample_rate, i_offset=None, filename=(output_dir+'/'+frame_file_name+'-'+str(i).zfill(3)+'.png'), ss_pf_list=ss_pfs)
-    ss_pfs = plot_profile(pfs_to_plot, sample_res, sample_rate, i_offset=i, filename=(output_dir+'/'+frame_file_name+'-'+str(i).zfill(3)+'.png'), ss_pf_list=ss_pfs)
+    fig         the figure to render
+    dpi         the resolution at which to render, in dots per inch
+    """
+    set_transparent_dpi(fig, dpi)
+    fig.canvas.draw()
+    # Copy the buffer, as it will be overwritten when the next frame is drawn
+    return Image.fromarray(np.asarray(fig.canvas.buffer_rgba()).copy())
 
-if not isinstance(ss_pfs, type(None)):
-    ss_pfs = pd.concat(ss_pfs)
-    ss_pfs.to_csv(frame_file_name+'.csv')
+def render_frame(pfs_to_plot, s_res, s_rate, png_prefix, i_offset):
+    """
+    Renders one frame of the animation. Made to be run in a worker process,
+    each of which makes its own figure on its first frame and reuses it
+    Returns a list of the dictionaries of arrays of the subsampled profiles,
+    and the frame as a gif-ready PIL image, or None if it was saved as a png
+
+    pfs_to_plot     A list of data frames, one for each profile
+    s_res       The resolution for sampling
+    s_rate      The sampling rate
+    png_prefix  The file path, without the frame number, to save the frame to
+                    as a png, or None to return it as a gif frame
+    i_offset    The index offset for subsampling
+    """
+    ss_pf_list = []
+    if isinstance(png_prefix, type(None)):
+        plot_profile(pfs_to_plot, s_res, s_rate, i_offset=i_offset, ss_pf_list=ss_pf_list, show=False)
+        # Leave the transparency threshold to create_gif.py, so the gif is the
+        #   same as running create_gif.py on the png frames
+        frame = generate_alpha_frame(canvas_to_image(_fig_cache['fig'], frame_dpi))
+    else:
+        plot_profile(pfs_to_plot, s_res, s_rate, i_offset=i_offset, filename=png_prefix+'-'+str(i_offset).zfill(3)+'.png', ss_pf_list=ss_pf_list)
+        frame = None
+    return ss_pf_list, frame
+
+def collect_frames(rendered, ss_pf_list):
+    """
+    Generates the frames from the results of render_frame, in order, while
+    storing the dictionaries of arrays of the subsampled profiles
+
+    rendered    an iterable of the results of render_frame
+    ss_pf_list  A blank list in which to store the dictionaries of arrays of
+                    the ss profiles
+    """
+    for frame_ss_pfs, frame in rendered:
+        ss_pf_list.extend(frame_ss_pfs)
+        yield frame
+
+################################################################################
+
+if __name__ == '__main__':
+    # Read and interpolate each profile once up front, so a missing csv is
+    #   found before any old output is removed, and so the worker processes
+    #   start with the cached arrays (when forked)
+    for pf in pfs_to_plot:
+        csv = pf['SOURCE']+'-'+pf['INSTRMT']+'_'+pf['PROF_NO']+'.csv'
+        # plot_T_S_separate always interpolates the single profile
+        _get_profile(csv, pf['p_lims'], pf['interpolate'] or len(pfs_to_plot) != 2, sample_res, sample_rate)
+
+    if write_ss_to_csv:
+        # Check whether there already exists a csv for the
+        if os.path.exists(frame_file_name+'.csv'):
+            os.remove(frame_file_name+'.csv')
+
+    if write_gif:
+        print('Saving gif to', gif_file)
+        png_prefix = None
+    else:
+        # Check whether there already exists a directory for the output frames
+        if os.path.exists(output_dir):
+            shutil.rmtree(output_dir)
+        os.makedirs(output_dir)
+        png_prefix = output_dir+'/'+frame_file_name
+
+    # Create empty list for the arrays of the subsampled profiles
+    ss_pfs = []
+
+    # Each frame only depends on its offset, so render them in parallel
+    with Pool(n_workers) as pool:
+        rendered = pool.imap(partial(render_frame, pfs_to_plot, sample_res, sample_rate, png_prefix), range(sample_rate))
+        if write_gif:
+            # Stream the frames into the gif as they are rendered
+            frames = collect_frames(rendered, ss_pfs)
+            first_frame = next(frames)
+            first_frame.save(gif_file, save_all=True, append_images=frames, duration=100, loop=0, optimize=False, disposal=2)
+        else:
+            # The frames were saved as pngs by the workers, so only collect
+            #   the arrays of the subsampled profiles
+            for frame_ss_pfs, frame in rendered:
+                ss_pfs.extend(frame_ss_pfs)
+
+    # Only keep the profiles that were subsampled
+    ss_pfs = [pf for pf in ss_pfs if not isinstance(pf, type(None))]
+    if ss_pfs:
+        # Build one output data frame from the arrays of all the frames
+        #   (with the index restarting for each profile of each frame, as
+        #   concatenating a data frame for each of them gave)
+        ss_index = np.concatenate([np.arange(len(pf['temp'])) for pf in ss_pfs])
+        ss_pfs = pd.DataFrame({col: np.concatenate([pf[col] for pf in ss_pfs]) for col in ss_pfs[0]}, index=ss_index)
+        ss_pfs.to_csv(frame_file_name+'.csv')
@@ -8,6 +8,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib as mpl
 import pandas as pd
+from itp_plot_utils import set_fig_axes # Shared with plot_ITP_profile.py
 
 ################################################################################
 
@@ -33,60 +34,20 @@ else:
     ss_clr  = 'k'
 ################################################################################
 
-def set_fig_axes(heights, widths, fig_ratio=0.5, fig_size=1, share_x_axis=None, share_y_axis=None, prjctn=None):
-    """
-    Creates fig and axes objects based on desired heights and widths of subplots
-    Ex: if widths=[1,5], there will be 2 columns, the 1st 1/5 the width of the 2nd
-
-    heights      array of integers for subplot height ratios, len=rows
-    widths       array of integers for subplot width  ratios, len=cols
-    fig_ratio    ratio of height to width of overall figure
-    fig_size     size scale factor, 1 changes nothing, 2 makes it very big
-    share_x_axis bool whether the subplots should share their x axes
-    share_y_axis bool whether the subplots should share their y axes
-    projection   projection type for the subplots
-    """
-    # Set aspect ratio of overall figure
-    w, h = mpl.figure.figaspect(fig_ratio)
-    # Find rows and columns of subplots
-    rows = len(heights)
-    cols = len(widths)
-    # This dictionary makes each subplot have the desired ratios
-    # The length of heights will be nrows and likewise len(widths)=ncols
-    plot_ratios = {'height_ratios': heights,
-                   'width_ratios': widths}
-    # Determine whether to share x or y axes
-    if share_x_axis == None and share_y_axis == None:
-        if rows == 1 and cols != 1: # if only one row, share y axis
-            share_x_axis = False
-            share_y_axis = True
-        elif rows != 1 and cols == 1: # if only one column, share x axis
-            share_x_axis = True
-            share_y_axis = False
-        else:                       # otherwise, forget about it
-            share_x_axis = False
-            share_y_axis = False
-    # Set ratios by passing dictionary as 'gridspec_kw', and share y axis
-    fig, axes = plt.subplots(figsize=(w*fig_size,h*fig_size), nrows=rows, ncols=cols, gridspec_kw=plot_ratios, sharex=share_x_axis, sharey=share_y_axis, subplot_kw=dict(projection=prjctn))
-    # Set ticklabel format for all axes
-    if (rows+cols)>2:
-        for ax in axes.flatten():
-            ax.ticklabel_format(style='sci', scilimits=(-3,3), useMathText=True)
-    else:
-        axes.ticklabel_format(style='sci', scilimits=(-3,3), useMathText=True)
-    return fig, axes
-
 def plot_T_S(ax, df):
     """
     Function to plot all T-S pairs the same color
     """
     temps = df.temp
     salts = df.salt
-    # Same color for every instrmt
-    ax.scatter(salts, temps, color=std_clr, s=0.5, marker='.')
+    # Same color for every instrmt, so plot the points as the markers of a
+    #   single line rather than a scatter, which handles each point on its own
+    #   (markersize is in points, where scatter's s is in points squared)
+    ax.plot(salts, temps, linestyle='None', marker='.', markersize=np.sqrt(0.5), color=std_clr)
     # Set titles and labels
-    ITP_ID = np.unique(np.array(df['ITP_ID']))[0]
-    ITP_pf = np.unique(np.array(df['ITP_pf']))[0]
+    # Each data frame holds just one profile, so the first row has the labels
+    ITP_ID = df['ITP_ID'].iloc[0]
+    ITP_pf = df['ITP_pf'].iloc[0]
     ax.set_title('ITP'+str(ITP_ID)+' profile '+str(ITP_pf))
     return r'Salinity (g/kg)', r'Temperature ($^\circ$C)'
 
@@ -102,18 +63,20 @@ def plot_T_v_S(csv_file, filename=None):
     """
     # Start plot title
     plt_title = 'T-S pairs from '+csv_file
-    # Get dataframe from csv file
-    data = pd.read_csv(csv_file+'.csv')
+    # Get dataframe from csv file, only parsing the columns that get plotted
+    #   or used to split up the profiles, with T and S as float32
+    data = pd.read_csv(csv_file+'.csv', usecols=['ITP_ID', 'ITP_pf', 'temp', 'salt'], dtype={'temp': np.float32, 'salt': np.float32}, engine='c')
+    # The ID columns only take a few values, so store them as categories
+    data[['ITP_ID', 'ITP_pf']] = data[['ITP_ID', 'ITP_pf']].astype('category')
     # Find the number of ITP ID's in the data
-    unique_ITP_IDs = np.unique(np.array(data['ITP_ID']))
+    unique_ITP_IDs = data['ITP_ID'].cat.categories.to_numpy()
     if len(unique_ITP_IDs) > 2:
         print('Thats too many ITPs')
         return
     else:
         for id in unique_ITP_IDs:
             # Find the number of profiles in each
-            unique_ITP_pfs = np.unique(np.array(data[(data['ITP_ID'] == id)]['ITP_pf']))
-            if len(unique_ITP_pfs) > 1:
+            if data[(data['ITP_ID'] == id)]['ITP_pf'].nunique() > 1:
                 print('Whoops')
                 return
     #
@@ -139,7 +102,9 @@ def plot_T_v_S(csv_file, filename=None):
     fig.suptitle(plt_title)
     #
     if filename != None:
-        plt.savefig(filename, dpi=400)
+        # Use light png compression, which is much quicker at 400 dpi for a
+        #   slightly larger file
+        plt.savefig(filename, dpi=400, pil_kwargs={'compress_level': 1})
         # Close the figure after saving to avoid memory leaks when making many
         #   figures in a loop
         plt.close(fig)